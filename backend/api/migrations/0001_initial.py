@@ -0,0 +1,67 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_location', models.CharField(max_length=255)),
+                ('pickup_location', models.CharField(max_length=255)),
+                ('dropoff_location', models.CharField(max_length=255)),
+                ('current_cycle_used', models.FloatField()),
+                ('lane', models.CharField(max_length=520)),
+                ('locations', models.JSONField()),
+                ('total_distance', models.FloatField()),
+                ('total_driving_time', models.FloatField()),
+                ('planned_start', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-planned_start'],
+                'indexes': [models.Index(fields=['lane', 'planned_start'], name='trip_lane_start_idx'), models.Index(fields=['planned_start'], name='trip_start_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Leg',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveSmallIntegerField()),
+                ('distance', models.FloatField()),
+                ('duration', models.FloatField()),
+                ('geometry', models.BinaryField()),
+                ('fuel_stops', models.JSONField(default=list)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='legs', to='api.trip')),
+            ],
+            options={
+                'ordering': ['sequence'],
+                'constraints': [models.UniqueConstraint(fields=('trip', 'sequence'), name='leg_trip_sequence_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TimelineEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('type', models.CharField(max_length=16)),
+                ('start_time', models.DateTimeField()),
+                ('duration', models.FloatField()),
+                ('distance', models.FloatField(blank=True, null=True)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(max_length=32)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='api.trip')),
+            ],
+            options={
+                'ordering': ['sequence'],
+                'constraints': [models.UniqueConstraint(fields=('trip', 'sequence'), name='event_trip_sequence_uniq')],
+            },
+        ),
+    ]
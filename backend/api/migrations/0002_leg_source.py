@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leg',
+            name='source',
+            field=models.CharField(blank=True, default='', max_length=16),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,201 @@
+"""
+ELD Trip Planner Models
+Persisted trip plans, route legs and HOS timeline events
+Route geometry is stored as packed float32 [lon, lat] pairs instead of JSON text
+"""
+from array import array
+from datetime import datetime, timezone as dt_timezone
+import sys
+
+from django.db import models, transaction
+from django.utils import timezone
+
+
+def pack_geometry(geometry):
+    """Pack a list of [lon, lat] points into little-endian float32 bytes"""
+    packed = array('f', (value for point in geometry for value in point[:2]))
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_geometry(blob):
+    """Unpack float32 bytes back into a list of [lon, lat] points"""
+    packed = array('f')
+    packed.frombytes(bytes(blob))
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return [[round(packed[i], 6), round(packed[i + 1], 6)] for i in range(0, len(packed) - 1, 2)]
+
+
+def make_lane(pickup_loc, dropoff_loc):
+    """Normalized pickup -> dropoff key used for lane lookups"""
+    return f"{pickup_loc.lower().strip()} -> {dropoff_loc.lower().strip()}"
+
+
+def _to_db_time(value):
+    """Timeline times are naive isoformat strings; store them as aware UTC"""
+    parsed = datetime.fromisoformat(value) if isinstance(value, str) else value
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def _from_db_time(value):
+    """Render a stored time exactly as generate_trip_plan emitted it"""
+    return timezone.make_naive(value, dt_timezone.utc).isoformat()
+
+
+class Trip(models.Model):
+    """A computed trip plan, stored so it can be served without recomputing"""
+    current_location = models.CharField(max_length=255)
+    pickup_location = models.CharField(max_length=255)
+    dropoff_location = models.CharField(max_length=255)
+    current_cycle_used = models.FloatField()
+    lane = models.CharField(max_length=520)
+    locations = models.JSONField()
+    total_distance = models.FloatField()
+    total_driving_time = models.FloatField()
+    planned_start = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-planned_start']
+        indexes = [
+            models.Index(fields=['lane', 'planned_start'], name='trip_lane_start_idx'),
+            models.Index(fields=['planned_start'], name='trip_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"Trip {self.pk}: {self.lane} @ {self.planned_start:%Y-%m-%d}"
+
+    @classmethod
+    def create_from_plan(cls, plan, current_cycle_used, legs):
+        """Persist a plan returned by generate_trip_plan along with its legs"""
+        locations = plan['locations']
+        timeline = plan['timeline']
+
+        with transaction.atomic():
+            trip = cls.objects.create(
+                current_location=locations['current']['name'],
+                pickup_location=locations['pickup']['name'],
+                dropoff_location=locations['dropoff']['name'],
+                current_cycle_used=current_cycle_used,
+                lane=make_lane(locations['pickup']['name'], locations['dropoff']['name']),
+                locations=locations,
+                total_distance=plan['route']['total_distance'],
+                total_driving_time=plan['route']['total_driving_time'],
+                planned_start=_to_db_time(timeline[0]['start_time']),
+            )
+
+            Leg.objects.bulk_create([
+                Leg(
+                    trip=trip,
+                    sequence=sequence,
+                    distance=leg['distance'],
+                    duration=leg['duration'],
+                    geometry=pack_geometry(leg['geometry']),
+                    source=leg.get('source', ''),
+                    fuel_stops=leg['fuel_stops'],
+                )
+                for sequence, leg in enumerate(legs)
+            ])
+
+            TimelineEvent.objects.bulk_create([
+                TimelineEvent(
+                    trip=trip,
+                    sequence=sequence,
+                    type=event['type'],
+                    start_time=_to_db_time(event['start_time']),
+                    duration=event['duration'],
+                    distance=event.get('distance'),
+                    location=event.get('location', ''),
+                    status=event['status'],
+                )
+                for sequence, event in enumerate(timeline)
+            ])
+
+        return trip
+
+    def to_plan(self):
+        """Rebuild the calculate_trip response body from stored rows"""
+        legs = list(self.legs.all())
+        geometry = []
+        fuel_stops = []
+        for leg in legs:
+            geometry += unpack_geometry(leg.geometry)
+            fuel_stops += leg.fuel_stops
+
+        timeline = []
+        for event in self.events.all():
+            entry = {
+                'type': event.type,
+                'start_time': _from_db_time(event.start_time),
+                'duration': event.duration,
+            }
+            if event.distance is not None:
+                entry['distance'] = event.distance
+            if event.location:
+                entry['location'] = event.location
+            entry['status'] = event.status
+            timeline.append(entry)
+
+        return {
+            'trip_id': self.pk,
+            'locations': self.locations,
+            'route': {
+                'total_distance': self.total_distance,
+                'total_driving_time': self.total_driving_time,
+                'geometry': geometry
+            },
+            'fuel_stops': fuel_stops,
+            'timeline': timeline
+        }
+
+    def to_summary(self):
+        """Lightweight listing entry that does not touch legs or events"""
+        return {
+            'trip_id': self.pk,
+            'lane': self.lane,
+            'current_location': self.current_location,
+            'pickup_location': self.pickup_location,
+            'dropoff_location': self.dropoff_location,
+            'planned_start': _from_db_time(self.planned_start),
+            'total_distance': self.total_distance,
+            'total_driving_time': self.total_driving_time,
+        }
+
+
+class Leg(models.Model):
+    """One routed leg of a trip (current -> pickup, pickup -> dropoff)"""
+    trip = models.ForeignKey(Trip, related_name='legs', on_delete=models.CASCADE)
+    sequence = models.PositiveSmallIntegerField()
+    distance = models.FloatField()
+    duration = models.FloatField()
+    geometry = models.BinaryField()
+    source = models.CharField(max_length=16, blank=True)
+    fuel_stops = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ['sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['trip', 'sequence'], name='leg_trip_sequence_uniq'),
+        ]
+
+
+class TimelineEvent(models.Model):
+    """A single HOS timeline entry (driving, fuel, break, rest, pickup, dropoff)"""
+    trip = models.ForeignKey(Trip, related_name='events', on_delete=models.CASCADE)
+    sequence = models.PositiveIntegerField()
+    type = models.CharField(max_length=16)
+    start_time = models.DateTimeField()
+    duration = models.FloatField()
+    distance = models.FloatField(null=True, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=32)
+
+    class Meta:
+        ordering = ['sequence']
+        constraints = [
+            models.UniqueConstraint(fields=['trip', 'sequence'], name='event_trip_sequence_uniq'),
+        ]
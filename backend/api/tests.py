@@ -0,0 +1,340 @@
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import time
+from unittest import mock
+
+from django.db import DatabaseError, OperationalError
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from . import views, warmup
+from .models import Trip, make_lane, pack_geometry, unpack_geometry
+from .upstream import CircuitBreaker
+
+COORDS = {
+    'chicago': {'lat': 41.8781, 'lon': -87.6298, 'display_name': 'Chicago'},
+    'kansas city': {'lat': 39.0997, 'lon': -94.5786, 'display_name': 'Kansas City'},
+    'los angeles': {'lat': 34.0522, 'lon': -118.2437, 'display_name': 'Los Angeles'},
+}
+
+TRIP_REQUEST = {
+    'current_location': 'Chicago',
+    'pickup_location': 'Kansas City',
+    'dropoff_location': 'Los Angeles',
+    'current_cycle_used': 10,
+}
+
+
+def fake_geocode(location):
+    return COORDS[location.lower().strip()]
+
+
+def build_plan():
+    """Run generate_trip_plan offline, with fallback routing"""
+    with mock.patch.object(views, 'geocode_location', fake_geocode), \
+            mock.patch.object(views, 'get_route', views.calculate_fallback_route):
+        plan, error = views.generate_trip_plan('Chicago', 'Kansas City', 'Los Angeles', 10)
+    assert error is None
+    return plan
+
+
+class GeometryPackingTests(SimpleTestCase):
+    def test_round_trip_within_float32_tolerance(self):
+        geometry = [[-87.6298, 41.8781], [-94.578567, 39.099724], [-118.243683, 34.052235]]
+        restored = unpack_geometry(pack_geometry(geometry))
+        self.assertEqual(len(restored), len(geometry))
+        for point, original in zip(restored, geometry):
+            self.assertAlmostEqual(point[0], original[0], delta=1e-5)
+            self.assertAlmostEqual(point[1], original[1], delta=1e-5)
+
+    def test_packs_two_float32_values_per_point(self):
+        self.assertEqual(len(pack_geometry([[1.0, 2.0], [3.0, 4.0]])), 16)
+        self.assertEqual(unpack_geometry(b''), [])
+
+
+class LaneTests(SimpleTestCase):
+    def test_lane_is_case_and_whitespace_insensitive(self):
+        self.assertEqual(make_lane('  Kansas City', 'LOS ANGELES '), 'kansas city -> los angeles')
+        self.assertEqual(make_lane('Kansas City', 'Los Angeles'), make_lane('kansas city', 'los angeles'))
+
+
+class TripStorageTests(TestCase):
+    def test_to_plan_matches_stored_plan(self):
+        plan = build_plan()
+        legs = plan.pop('legs')
+        trip = Trip.create_from_plan(plan, 10, legs)
+
+        stored = Trip.objects.get(pk=trip.pk).to_plan()
+        self.assertEqual(stored['trip_id'], trip.pk)
+        self.assertEqual(stored['timeline'], plan['timeline'])
+        self.assertEqual(stored['fuel_stops'], plan['fuel_stops'])
+        self.assertEqual(stored['locations'], plan['locations'])
+        self.assertEqual(stored['route']['total_distance'], plan['route']['total_distance'])
+        self.assertEqual(len(stored['route']['geometry']), len(plan['route']['geometry']))
+
+
+class TripApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        plan = build_plan()
+        legs = plan.pop('legs')
+        self.trip = Trip.create_from_plan(plan, 10, legs)
+        self.day = plan['timeline'][0]['start_time'][:10]
+
+    def test_calculate_trip_stores_plan(self):
+        with mock.patch.object(views, 'geocode_location', fake_geocode), \
+                mock.patch.object(views, 'get_route', views.calculate_fallback_route):
+            response = self.client.post('/api/calculate-trip/', TRIP_REQUEST, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Trip.objects.filter(pk=response.data['trip_id']).exists())
+        self.assertNotIn('legs', response.data)
+
+    def test_calculate_trip_returns_plan_when_storage_fails(self):
+        with mock.patch.object(views, 'geocode_location', fake_geocode), \
+                mock.patch.object(views, 'get_route', views.calculate_fallback_route), \
+                mock.patch.object(Trip, 'create_from_plan', side_effect=DatabaseError('locked')):
+            response = self.client.post('/api/calculate-trip/', TRIP_REQUEST, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('trip_id', response.data)
+        self.assertTrue(response.data['timeline'])
+
+    def test_get_trip(self):
+        response = self.client.get(f'/api/trips/{self.trip.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['trip_id'], self.trip.pk)
+
+    def test_get_trip_not_found(self):
+        response = self.client.get('/api/trips/999999/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_trips_by_lane(self):
+        response = self.client.get('/api/trips/', {'pickup_location': ' KANSAS CITY', 'dropoff_location': 'los angeles'})
+        self.assertEqual([t['trip_id'] for t in response.data['trips']], [self.trip.pk])
+
+        response = self.client.get('/api/trips/', {'pickup_location': 'Los Angeles', 'dropoff_location': 'Kansas City'})
+        self.assertEqual(response.data['trips'], [])
+
+    def test_list_trips_by_date(self):
+        response = self.client.get('/api/trips/', {'date': self.day})
+        self.assertEqual([t['trip_id'] for t in response.data['trips']], [self.trip.pk])
+
+        other_day = datetime.fromordinal(datetime.strptime(self.day, '%Y-%m-%d').toordinal() + 1)
+        response = self.client.get('/api/trips/', {'date': other_day.strftime('%Y-%m-%d')})
+        self.assertEqual(response.data['trips'], [])
+
+    def test_list_trips_rejects_bad_date(self):
+        response = self.client.get('/api/trips/', {'date': '19-10-2026'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_trips_requires_both_lane_ends(self):
+        response = self.client.get('/api/trips/', {'pickup_location': 'Kansas City'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/trips/', {'dropoff_location': 'Los Angeles'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def make_breaker(self, **kwargs):
+        options = {'max_timeout': 10, 'min_timeout': 2, 'failure_threshold': 3, 'cooldown': 30}
+        options.update(kwargs)
+        return CircuitBreaker('test', **options)
+
+    def open_breaker(self, breaker):
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+
+    def run_probe(self, breaker):
+        """Trigger the background probe and wait for it to finish"""
+        done = threading.Event()
+        probe = breaker.probe
+
+        def probe_and_signal(timeout):
+            try:
+                return probe(timeout)
+            finally:
+                done.set()
+
+        breaker.probe = probe_and_signal
+        self.assertFalse(breaker.allow_request())
+        self.assertTrue(done.wait(1))
+        for _ in range(100):
+            if breaker.state != CircuitBreaker.HALF_OPEN:
+                break
+            time.sleep(0.01)
+
+    def test_opens_after_failure_threshold(self):
+        breaker = self.make_breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_success_resets_failure_count(self):
+        breaker = self.make_breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success(0.5)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_short_circuits_until_cooldown(self):
+        probe = mock.Mock(return_value=False)
+        breaker = self.make_breaker(probe=probe)
+        with mock.patch('api.upstream.time.monotonic', return_value=100.0):
+            self.open_breaker(breaker)
+        with mock.patch('api.upstream.time.monotonic', return_value=129.0):
+            self.assertFalse(breaker.allow_request())
+            self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        probe.assert_not_called()
+        self.assertEqual(breaker.snapshot()['short_circuited'], 2)
+
+    def test_successful_probe_closes(self):
+        breaker = self.make_breaker(cooldown=0, probe=lambda timeout: True)
+        self.open_breaker(breaker)
+        self.run_probe(breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.snapshot()['samples'], 1)
+
+    def test_failed_probe_stays_open(self):
+        breaker = self.make_breaker(cooldown=0, probe=lambda timeout: False)
+        self.open_breaker(breaker)
+        self.run_probe(breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_probe_error_stays_open(self):
+        def probe(timeout):
+            raise ConnectionError('down')
+
+        breaker = self.make_breaker(cooldown=0, probe=probe)
+        self.open_breaker(breaker)
+        self.run_probe(breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_timeout_uses_max_until_enough_samples(self):
+        breaker = self.make_breaker(min_samples=10)
+        for _ in range(9):
+            breaker.record_success(0.1)
+        self.assertEqual(breaker.timeout(), 10)
+
+    def test_timeout_clamps_to_min(self):
+        breaker = self.make_breaker(min_samples=10)
+        for _ in range(20):
+            breaker.record_success(0.1)
+        self.assertEqual(breaker.timeout(), 2)
+
+    def test_timeout_clamps_to_max(self):
+        breaker = self.make_breaker(min_samples=10)
+        for _ in range(20):
+            breaker.record_success(30)
+        self.assertEqual(breaker.timeout(), 10)
+
+    def test_timeout_tracks_percentile(self):
+        breaker = self.make_breaker(min_samples=10, headroom=1.5)
+        for _ in range(20):
+            breaker.record_success(4)
+        self.assertAlmostEqual(breaker.timeout(), 6)
+
+    def test_timed_out_calls_raise_the_timeout(self):
+        breaker = self.make_breaker(min_samples=10, failure_threshold=100)
+        for _ in range(100):
+            breaker.record_success(1)
+        self.assertEqual(breaker.timeout(), 2)
+        for _ in range(3):
+            breaker.record_failure(latency=breaker.timeout())
+        self.assertGreater(breaker.timeout(), 2)
+
+
+class RouteCacheTests(SimpleTestCase):
+    def setUp(self):
+        views.ROUTE_CACHE.clear()
+        self.addCleanup(views.ROUTE_CACHE.clear)
+
+    def test_cached_route_round_trips_with_packed_geometry(self):
+        route = {'distance': 10.0, 'duration': 0.2, 'geometry': [[-87.5, 41.5], [-87.25, 41.75]], 'source': 'osrm'}
+        views.cache_route('key', route)
+        self.assertIsInstance(views.ROUTE_CACHE['key']['geometry'], bytes)
+        self.assertEqual(views.get_cached_route('key'), route)
+        self.assertIsNone(views.get_cached_route('missing'))
+
+    def test_evicts_least_recently_used(self):
+        route = {'distance': 1.0, 'duration': 1.0, 'geometry': [[0.0, 0.0]], 'source': 'osrm'}
+        with mock.patch.object(views, 'ROUTE_CACHE_SIZE', 2):
+            views.cache_route('a', route)
+            views.cache_route('b', route)
+            views.get_cached_route('a')
+            views.cache_route('c', route)
+        self.assertEqual(list(views.ROUTE_CACHE), ['a', 'c'])
+
+    def test_eviction_during_lookup_does_not_raise(self):
+        route = {'distance': 1.0, 'duration': 1.0, 'geometry': [[0.0, 0.0]], 'source': 'osrm'}
+        evictors = []
+
+        class RacingCache(OrderedDict):
+            """Tries to evict the looked-up key between get() and move_to_end()"""
+            def get(self, key, default=None):
+                value = super().get(key, default)
+                evictor = threading.Thread(target=views.cache_route, args=('other', route))
+                evictor.start()
+                evictor.join(0.2)
+                evictors.append(evictor)
+                return value
+
+        with mock.patch.object(views, 'ROUTE_CACHE', RacingCache()), \
+                mock.patch.object(views, 'ROUTE_CACHE_SIZE', 1):
+            views.cache_route('key', route)
+            self.assertEqual(views.get_cached_route('key'), route)
+            for evictor in evictors:
+                evictor.join()
+            self.assertEqual(list(views.ROUTE_CACHE), ['other'])
+
+
+class PrewarmTests(TestCase):
+    def setUp(self):
+        views.GEOCODE_CACHE.clear()
+        views.ROUTE_CACHE.clear()
+        self.addCleanup(views.GEOCODE_CACHE.clear)
+        self.addCleanup(views.ROUTE_CACHE.clear)
+
+    def store_trip(self, pickup, dropoff, source='osrm'):
+        plan = build_plan()
+        legs = [dict(leg, source=source) for leg in plan.pop('legs')]
+        plan['locations']['pickup']['name'] = pickup
+        plan['locations']['pickup']['coords'] = dict(plan['locations']['pickup']['coords'], lat=len(pickup))
+        plan['locations']['dropoff']['name'] = dropoff
+        return Trip.create_from_plan(plan, 10, legs)
+
+    def test_seeds_caches_from_stored_osrm_legs(self):
+        self.store_trip('Kansas City', 'Los Angeles')
+        self.store_trip('Denver', 'Phoenix', source='fallback')
+        stats = warmup.prewarm()
+        self.assertIsNone(stats['prewarm_error'])
+        self.assertIn('kansas city', views.GEOCODE_CACHE)
+        self.assertIn('denver', views.GEOCODE_CACHE)
+        self.assertEqual(stats['prewarmed_routes'], 2)
+        self.assertEqual(len(views.ROUTE_CACHE), 2)
+
+    def test_repeated_lane_is_cached_once(self):
+        self.store_trip('Kansas City', 'Los Angeles')
+        self.store_trip('Kansas City', 'Los Angeles')
+        stats = warmup.prewarm()
+        self.assertEqual(stats['prewarmed_routes'], 2)
+        self.assertEqual(len(views.ROUTE_CACHE), 2)
+
+    def test_routes_capped_at_cache_size(self):
+        self.store_trip('Kansas City', 'Los Angeles')
+        self.store_trip('Denver', 'Phoenix')
+        with mock.patch.object(views, 'ROUTE_CACHE_SIZE', 3):
+            stats = warmup.prewarm()
+        self.assertEqual(stats['prewarmed_routes'], 3)
+        self.assertEqual(len(views.ROUTE_CACHE), 3)
+
+    def test_missing_tables_leave_caches_cold(self):
+        with mock.patch.object(Trip.objects, 'order_by', side_effect=OperationalError('no such table: api_trip')):
+            stats = warmup.prewarm()
+        self.assertIn('no such table', stats['prewarm_error'])
+        self.assertEqual(views.GEOCODE_CACHE, {})
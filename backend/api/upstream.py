@@ -0,0 +1,148 @@
+"""
+Upstream Circuit Breaker
+Tracks latency and failures for an external service (Nominatim, OSRM),
+derives request timeouts from observed latency percentiles and short-circuits
+calls while the service is down, probing in the background before closing
+"""
+from collections import deque
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Per-upstream circuit breaker with adaptive timeouts"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, max_timeout, min_timeout=2.0, failure_threshold=3,
+                 cooldown=30.0, window=100, min_samples=10, percentile=0.99,
+                 headroom=1.5, probe=None):
+        self.name = name
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.headroom = headroom
+        self.probe = probe
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._total_failures = 0
+        self._short_circuited = 0
+
+    @property
+    def state(self):
+        return self._state
+
+    def _latency_percentile(self, percentile):
+        """Nearest-rank percentile of the recent latency window (caller holds lock)"""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        rank = min(len(ordered) - 1, max(0, int(round(percentile * len(ordered))) - 1))
+        return ordered[rank]
+
+    def timeout(self):
+        """Request timeout derived from observed latency, capped at max_timeout"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.max_timeout
+            observed = self._latency_percentile(self.percentile) * self.headroom
+        return min(self.max_timeout, max(self.min_timeout, observed))
+
+    def allow_request(self):
+        """Return True if a live call may be made, False to short-circuit"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            self._short_circuited += 1
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = self.HALF_OPEN
+                self._start_probe()
+            return False
+
+    def record_success(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+            self._close()
+
+    def record_failure(self, latency=None):
+        """Count a failed call; timed-out calls pass the timeout they waited out
+        as latency so the window keeps up with an upstream that got slower"""
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            self._consecutive_failures += 1
+            self._total_failures += 1
+            if self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        """Trip the breaker (caller holds lock)"""
+        print(f"Circuit {self.name} opened after {self._consecutive_failures} consecutive failures")
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+
+    def _close(self):
+        """Resume live calls (caller holds lock)"""
+        if self._state != self.CLOSED:
+            print(f"Circuit {self.name} closed")
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+
+    def _start_probe(self):
+        """Check the upstream off the request path (caller holds lock)"""
+        if self.probe is None:
+            # Nothing to probe with, let the next live request through instead
+            self._state = self.CLOSED
+            self._consecutive_failures = self.failure_threshold - 1
+            return
+        threading.Thread(target=self._run_probe, name=f"{self.name}-probe", daemon=True).start()
+
+    def _run_probe(self):
+        started = time.monotonic()
+        try:
+            healthy = self.probe(self.max_timeout)
+        except Exception as e:
+            print(f"Circuit {self.name} probe error: {e}")
+            healthy = False
+
+        with self._lock:
+            if healthy:
+                self._latencies.append(time.monotonic() - started)
+                self._close()
+            else:
+                print(f"Circuit {self.name} probe failed, staying open")
+                self._total_failures += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self):
+        """Operator-facing view of breaker state (per process, not shared across workers)"""
+        with self._lock:
+            p50 = self._latency_percentile(0.5)
+            p99 = self._latency_percentile(0.99)
+            retry_in = None
+            if self._state == self.OPEN:
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+            state = {
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'total_failures': self._total_failures,
+                'short_circuited': self._short_circuited,
+                'samples': len(self._latencies),
+                'latency_p50': round(p50, 3) if p50 is not None else None,
+                'latency_p99': round(p99, 3) if p99 is not None else None,
+                'probe_in': round(retry_in, 1) if retry_in is not None else None,
+            }
+        state['timeout'] = round(self.timeout(), 2)
+        return state
@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import calculate_trip, health_check
+from .views import calculate_trip, get_trip, health_check, list_trips
 
 urlpatterns = [
     path('calculate-trip/', calculate_trip, name='calculate_trip'),
+    path('trips/', list_trips, name='list_trips'),
+    path('trips/<int:trip_id>/', get_trip, name='get_trip'),
     path('health/', health_check, name='health_check'),
 ]
\ No newline at end of file
@@ -7,10 +7,19 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 import requests
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import DatabaseError
+from django.utils import timezone
 import math
+import os
+import threading
 import time
 
+from .models import Trip, make_lane, pack_geometry, unpack_geometry
+from .upstream import CircuitBreaker
+from .warmup import STARTUP_STATS
+
 # Constants for HOS Rules (70-hour/8-day cycle)
 MAX_DRIVING_HOURS = 11
 MAX_ON_DUTY_WINDOW = 14
@@ -21,9 +30,43 @@ MAX_WEEKLY_HOURS = 70
 FUEL_STOP_MILES = 950
 AVERAGE_SPEED = 60  # mph
 
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+OSRM_URL = "https://router.project-osrm.org/route/v1/driving"
+USER_AGENT = 'ELD-Trip-Planner/1.0 (Educational Project)'
+
 # Cache for geocoding to avoid repeated requests
 GEOCODE_CACHE = {}
 
+# LRU cache for successful OSRM routes, keyed by rounded endpoint coordinates.
+# Geometry is kept packed (see pack_geometry) so entries stay small.
+ROUTE_CACHE = OrderedDict()
+ROUTE_CACHE_SIZE = 256
+ROUTE_CACHE_LOCK = threading.Lock()
+
+def probe_nominatim(timeout):
+    """Background health probe for the geocoding upstream"""
+    response = requests.get(
+        NOMINATIM_URL,
+        params={'q': 'Chicago', 'format': 'json', 'limit': 1},
+        headers={'User-Agent': USER_AGENT},
+        timeout=timeout
+    )
+    return response.status_code == 200
+
+def probe_osrm(timeout):
+    """Background health probe for the routing upstream"""
+    response = requests.get(
+        f"{OSRM_URL}/-87.6298,41.8781;-87.9065,43.0389",
+        params={'overview': 'false'},
+        headers={'User-Agent': USER_AGENT},
+        timeout=timeout
+    )
+    return response.status_code == 200 and response.json().get('code') == 'Ok'
+
+# Circuit breakers for upstream services; timeouts adapt to observed latency
+GEOCODE_BREAKER = CircuitBreaker('nominatim', max_timeout=10, probe=probe_nominatim)
+ROUTE_BREAKER = CircuitBreaker('osrm', max_timeout=15, min_timeout=3, probe=probe_osrm)
+
 def geocode_location(location):
     """Convert location string to coordinates using Nominatim (OpenStreetMap)"""
     # Check cache first
@@ -32,28 +75,40 @@ def geocode_location(location):
         print(f"Using cached coordinates for: {location}")
         return GEOCODE_CACHE[cache_key]
     
+    if not GEOCODE_BREAKER.allow_request():
+        print(f"Geocoding circuit open, skipping: {location}")
+        return None
+    
     try:
         # Add delay to respect rate limits (1 request per second for Nominatim)
         time.sleep(1.0)
         
-        url = f"https://nominatim.openstreetmap.org/search"
         params = {
             'q': location,
             'format': 'json',
             'limit': 1
         }
         headers = {
-            'User-Agent': 'ELD-Trip-Planner/1.0 (Educational Project)',
+            'User-Agent': USER_AGENT,
             'Accept': 'application/json'
         }
         
         print(f"Geocoding: {location}")
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        started = time.monotonic()
+        geocode_timeout = GEOCODE_BREAKER.timeout()
+        response = requests.get(NOMINATIM_URL, params=params, headers=headers, timeout=geocode_timeout)
         
         if response.status_code == 429:
             print("Rate limit hit, waiting longer...")
             time.sleep(5)
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+            started = time.monotonic()
+            geocode_timeout = GEOCODE_BREAKER.timeout()
+            response = requests.get(NOMINATIM_URL, params=params, headers=headers, timeout=geocode_timeout)
+        
+        if response.status_code >= 500:
+            GEOCODE_BREAKER.record_failure()
+        else:
+            GEOCODE_BREAKER.record_success(time.monotonic() - started)
         
         if response.status_code != 200:
             print(f"Geocoding failed with status: {response.status_code}")
@@ -76,23 +131,63 @@ def geocode_location(location):
             return None
             
     except requests.Timeout:
+        GEOCODE_BREAKER.record_failure(latency=geocode_timeout)
         print(f"Timeout geocoding: {location}")
         return None
     except requests.RequestException as e:
+        GEOCODE_BREAKER.record_failure()
         print(f"Request error geocoding {location}: {e}")
         return None
     except Exception as e:
         print(f"Unexpected error geocoding {location}: {e}")
         return None
 
+def route_cache_key(start_coords, end_coords):
+    """Cache key for a route, rounded to ~1 m so equivalent geocodes share it"""
+    return (
+        round(start_coords['lon'], 5), round(start_coords['lat'], 5),
+        round(end_coords['lon'], 5), round(end_coords['lat'], 5)
+    )
+
+def cache_route(cache_key, route):
+    """Store a route in ROUTE_CACHE, evicting the least recently used entries"""
+    geometry = route['geometry']
+    if not isinstance(geometry, bytes):
+        geometry = pack_geometry(geometry)
+    with ROUTE_CACHE_LOCK:
+        ROUTE_CACHE[cache_key] = dict(route, geometry=geometry)
+        ROUTE_CACHE.move_to_end(cache_key)
+        while len(ROUTE_CACHE) > ROUTE_CACHE_SIZE:
+            ROUTE_CACHE.popitem(last=False)
+
+def get_cached_route(cache_key):
+    """Look up a route in ROUTE_CACHE, returning it with unpacked geometry"""
+    with ROUTE_CACHE_LOCK:
+        cached = ROUTE_CACHE.get(cache_key)
+        if cached is None:
+            return None
+        ROUTE_CACHE.move_to_end(cache_key)
+    # Unpack outside the lock; the cached entry itself is never mutated
+    return dict(cached, geometry=unpack_geometry(cached['geometry']))
+
 def get_route(start_coords, end_coords):
     """Get route using OSRM for real road routing with fallback"""
+    cache_key = route_cache_key(start_coords, end_coords)
+    cached = get_cached_route(cache_key)
+    if cached is not None:
+        print("Using cached OSRM route")
+        return cached
+    
+    if not ROUTE_BREAKER.allow_request():
+        print("OSRM circuit open, using fallback")
+        return calculate_fallback_route(start_coords, end_coords)
+    
     try:
         # Try OSRM first for real road routing
         print(f"Attempting OSRM routing...")
         
         # OSRM API endpoint (public instance)
-        url = f"https://router.project-osrm.org/route/v1/driving/{start_coords['lon']},{start_coords['lat']};{end_coords['lon']},{end_coords['lat']}"
+        url = f"{OSRM_URL}/{start_coords['lon']},{start_coords['lat']};{end_coords['lon']},{end_coords['lat']}"
         
         params = {
             'overview': 'full',
@@ -104,7 +199,14 @@ def get_route(start_coords, end_coords):
             'User-Agent': 'ELD-Trip-Planner/1.0'
         }
         
-        response = requests.get(url, params=params, headers=headers, timeout=15)
+        started = time.monotonic()
+        route_timeout = ROUTE_BREAKER.timeout()
+        response = requests.get(url, params=params, headers=headers, timeout=route_timeout)
+        
+        if response.status_code >= 500:
+            ROUTE_BREAKER.record_failure()
+        else:
+            ROUTE_BREAKER.record_success(time.monotonic() - started)
         
         if response.status_code == 200:
             data = response.json()
@@ -117,18 +219,26 @@ def get_route(start_coords, end_coords):
                 
                 print(f"✓ OSRM routing successful: {distance_meters/1609.34:.1f} miles, {duration_seconds/3600:.1f} hours")
                 
-                return {
+                result = {
                     'distance': distance_meters / 1609.34,  # Convert to miles
                     'duration': duration_seconds / 3600,    # Convert to hours
-                    'geometry': geometry  # [lon, lat] format
+                    'geometry': geometry,  # [lon, lat] format
+                    'source': 'osrm'
                 }
+                cache_route(cache_key, result)
+                return result
         
         print(f"OSRM failed or rate limited, using fallback calculation")
         return calculate_fallback_route(start_coords, end_coords)
         
     except requests.Timeout:
+        ROUTE_BREAKER.record_failure(latency=route_timeout)
         print("OSRM timeout, using fallback")
         return calculate_fallback_route(start_coords, end_coords)
+    except requests.RequestException as e:
+        ROUTE_BREAKER.record_failure()
+        print(f"OSRM error: {e}, using fallback")
+        return calculate_fallback_route(start_coords, end_coords)
     except Exception as e:
         print(f"OSRM error: {e}, using fallback")
         return calculate_fallback_route(start_coords, end_coords)
@@ -163,7 +273,8 @@ def calculate_fallback_route(start_coords, end_coords):
     return {
         'distance': road_distance,
         'duration': road_distance / AVERAGE_SPEED,
-        'geometry': geometry
+        'geometry': geometry,
+        'source': 'fallback'
     }
 
 def calculate_fuel_stops(route_distance, route_geometry):
@@ -437,7 +548,11 @@ def generate_trip_plan(current_loc, pickup_loc, dropoff_loc, current_cycle_used)
             'geometry': route_to_pickup['geometry'] + route_to_dropoff['geometry']
         },
         'fuel_stops': fuel_stops_leg1 + fuel_stops_leg2,
-        'timeline': timeline
+        'timeline': timeline,
+        'legs': [
+            dict(route_to_pickup, fuel_stops=fuel_stops_leg1),
+            dict(route_to_dropoff, fuel_stops=fuel_stops_leg2)
+        ]
     }, None
 
 @api_view(['POST'])
@@ -479,9 +594,76 @@ def calculate_trip(request):
         print(f"ERROR: {error}")
         return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
     
+    # Persist the plan so dispatch can reopen it without recomputing.
+    # A storage failure should not throw away a plan that was already computed,
+    # so the plan is still returned, just without a trip_id.
+    legs = result.pop('legs')
+    try:
+        trip = Trip.create_from_plan(result, current_cycle_used, legs)
+        result['trip_id'] = trip.pk
+    except DatabaseError as e:
+        print(f"ERROR: Unable to store trip plan: {e}")
+    
     return Response(result, status=status.HTTP_200_OK)
 
+@api_view(['GET'])
+def list_trips(request):
+    """List stored trips, optionally filtered by lane (pickup + dropoff) and date"""
+    trips = Trip.objects.all()
+    
+    pickup_loc = request.query_params.get('pickup_location')
+    dropoff_loc = request.query_params.get('dropoff_location')
+    if pickup_loc and dropoff_loc:
+        trips = trips.filter(lane=make_lane(pickup_loc, dropoff_loc))
+    elif pickup_loc or dropoff_loc:
+        return Response(
+            {'error': 'pickup_location and dropoff_location must be given together'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    date = request.query_params.get('date')
+    if date:
+        try:
+            day = datetime.strptime(date, '%Y-%m-%d')
+        except ValueError:
+            return Response(
+                {'error': 'date must be in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start = timezone.make_aware(day, dt_timezone.utc)
+        trips = trips.filter(planned_start__gte=start, planned_start__lt=start + timedelta(days=1))
+    
+    return Response(
+        {'trips': [trip.to_summary() for trip in trips[:100]]},
+        status=status.HTTP_200_OK
+    )
+
+@api_view(['GET'])
+def get_trip(request, trip_id):
+    """Serve a stored trip plan without recomputing it"""
+    try:
+        trip = Trip.objects.get(pk=trip_id)
+    except Trip.DoesNotExist:
+        return Response({'error': f'Trip not found: {trip_id}'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(trip.to_plan(), status=status.HTTP_200_OK)
+
 @api_view(['GET'])
 def health_check(request):
-    """Health check endpoint"""
-    return Response({'status': 'healthy'}, status=status.HTTP_200_OK)
\ No newline at end of file
+    """Health check endpoint, including upstream circuit breaker and startup state
+
+    Breakers live in each gunicorn worker, so 'upstreams' describes only the
+    worker that served this request (identified by worker_pid).
+    """
+    return Response({
+        'status': 'healthy',
+        'startup': dict(STARTUP_STATS, worker_pid=os.getpid()),
+        'upstreams': {
+            'scope': 'worker',
+            'worker_pid': os.getpid(),
+            'breakers': {
+                GEOCODE_BREAKER.name: GEOCODE_BREAKER.snapshot(),
+                ROUTE_BREAKER.name: ROUTE_BREAKER.snapshot()
+            }
+        }
+    }, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""
+Worker Pre-warming
+Loads the geocode and route caches from stored trips and builds the URL
+resolver so gunicorn workers start fast. With preload_app this runs once in the
+master process and every forked worker inherits the warm caches.
+Also records startup timings, including time from server start to the first
+request each worker serves.
+"""
+import os
+import time
+
+from django.core.signals import request_finished, request_started
+from django.db import DatabaseError, connections
+from django.urls import resolve
+
+from .models import Leg, Trip
+
+# Most recent trips used to seed the geocode cache; routes are additionally
+# capped at ROUTE_CACHE_SIZE so the master does not balloon before forking
+PREWARM_TRIPS = 500
+
+# Wall-clock server start, set by the container entrypoint or gunicorn.conf.py
+os.environ.setdefault('SERVER_STARTED_AT', str(time.time()))
+
+# Timings reported by the health endpoint
+STARTUP_STATS = {
+    'wsgi_load_seconds': None,
+    'prewarm_seconds': None,
+    'prewarmed_geocodes': 0,
+    'prewarmed_routes': 0,
+    'prewarmed_in_pid': None,
+    'prewarm_error': None,
+    'first_request_seconds': None,
+    'first_request_latency': None,
+}
+
+_first_request_started = None
+
+def _on_request_started(sender, **kwargs):
+    global _first_request_started
+    if _first_request_started is None:
+        _first_request_started = time.monotonic()
+
+def _on_request_finished(sender, **kwargs):
+    """Record time from server start to the end of this worker's first request"""
+    if STARTUP_STATS['first_request_seconds'] is not None or _first_request_started is None:
+        return
+    server_started = float(os.environ['SERVER_STARTED_AT'])
+    STARTUP_STATS['first_request_seconds'] = round(time.time() - server_started, 3)
+    STARTUP_STATS['first_request_latency'] = round(time.monotonic() - _first_request_started, 3)
+    request_started.disconnect(_on_request_started)
+    request_finished.disconnect(_on_request_finished)
+
+request_started.connect(_on_request_started)
+request_finished.connect(_on_request_finished)
+
+def prewarm(limit=PREWARM_TRIPS):
+    """Seed GEOCODE_CACHE and ROUTE_CACHE from the most recent stored trips"""
+    from .views import GEOCODE_CACHE, ROUTE_CACHE_SIZE, cache_route, route_cache_key
+
+    started = time.monotonic()
+
+    # Build the URL resolver up front instead of on the first request
+    resolve('/api/health/')
+
+    geocodes = 0
+    routes = 0
+    error = None
+    try:
+        trips = list(Trip.objects.order_by('-planned_start')[:limit])
+        trips_by_id = {trip.pk: trip for trip in trips}
+
+        for trip in trips:
+            for location in trip.locations.values():
+                cache_key = location['name'].lower().strip()
+                if cache_key not in GEOCODE_CACHE:
+                    GEOCODE_CACHE[cache_key] = location['coords']
+                    geocodes += 1
+
+        # Only real OSRM legs are cached; fallback legs would hide a recovered upstream
+        legs = Leg.objects.filter(trip_id__in=trips_by_id, source='osrm') \
+            .order_by('-trip__planned_start', 'sequence')[:ROUTE_CACHE_SIZE]
+        newest = {}
+        for leg in legs:
+            locations = trips_by_id[leg.trip_id].locations
+            endpoints = ('current', 'pickup') if leg.sequence == 0 else ('pickup', 'dropoff')
+            cache_key = route_cache_key(locations[endpoints[0]]['coords'], locations[endpoints[1]]['coords'])
+            newest.setdefault(cache_key, leg)
+
+        # Newest routes are inserted last so they are the most recently used.
+        # Geometry stays packed; cache_route stores bytes as-is.
+        for cache_key, leg in reversed(newest.items()):
+            cache_route(cache_key, {
+                'distance': leg.distance,
+                'duration': leg.duration,
+                'geometry': bytes(leg.geometry),
+                'source': leg.source
+            })
+            routes += 1
+    except DatabaseError as e:
+        # e.g. migrations not applied yet; serve with cold caches rather than crash
+        print(f"Pre-warm skipped, database unavailable: {e}")
+        error = str(e)
+    finally:
+        # Connections must not be shared across forked workers
+        connections.close_all()
+
+    STARTUP_STATS.update({
+        'prewarm_seconds': round(time.monotonic() - started, 3),
+        'prewarmed_geocodes': geocodes,
+        'prewarmed_routes': routes,
+        'prewarmed_in_pid': os.getpid(),
+        'prewarm_error': error,
+    })
+    print(f"Pre-warmed {geocodes} geocodes and {routes} routes in {STARTUP_STATS['prewarm_seconds']}s")
+    return STARTUP_STATS
@@ -28,6 +28,10 @@ DEBUG = config('DEBUG', default=True, cast=bool)
 
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1', cast=Csv())
 
+# Lean API-only profile: skip admin, sessions, messages, staticfiles and the
+# browsable API, none of which the JSON API uses
+API_ONLY = config('API_ONLY', default=False, cast=bool)
+
 
 # Application definition
 
@@ -54,6 +58,27 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if API_ONLY:
+    INSTALLED_APPS = [
+        'rest_framework',
+        'corsheaders',
+        'api',
+    ]
+
+    MIDDLEWARE = [
+        'django.middleware.security.SecurityMiddleware',
+        'corsheaders.middleware.CorsMiddleware',
+        'django.middleware.common.CommonMiddleware',
+    ]
+
+    REST_FRAMEWORK = {
+        'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+        'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
+        'DEFAULT_AUTHENTICATION_CLASSES': [],
+        'DEFAULT_PERMISSION_CLASSES': [],
+        'UNAUTHENTICATED_USER': None,
+    }
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -71,6 +96,9 @@ TEMPLATES = [
     },
 ]
 
+if API_ONLY:
+    TEMPLATES = []
+
 WSGI_APPLICATION = 'app.wsgi.application'
 
 
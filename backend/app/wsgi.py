@@ -8,9 +8,16 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
 import os
+import time
+
+_load_started = time.monotonic()
 
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+from api.warmup import STARTUP_STATS
+
+STARTUP_STATS['wsgi_load_seconds'] = round(time.monotonic() - _load_started, 3)
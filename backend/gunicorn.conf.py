@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration for the backend container
+With preload_app the Django app and the pre-warmed caches are loaded once in
+the master process and shared by every forked worker.
+"""
+import os
+import time
+
+# Gunicorn reads module globals as settings, and `config` is one of them
+from decouple import config as env
+
+# Reference point for first_request_seconds in /api/health/
+os.environ.setdefault('SERVER_STARTED_AT', str(time.time()))
+
+bind = env('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = env('GUNICORN_WORKERS', default=3, cast=int)
+preload_app = env('GUNICORN_PRELOAD', default=True, cast=bool)
+_prewarm_caches = env('PREWARM_CACHES', default=True, cast=bool)
+
+
+def _prewarm():
+    from api.warmup import prewarm
+    prewarm()
+
+
+def on_starting(server):
+    # Runs in the master after the preloaded app is imported, before forking
+    if preload_app and _prewarm_caches:
+        _prewarm()
+
+
+def post_worker_init(worker):
+    # Without preload each worker loads the app itself, so warm it here
+    if not preload_app and _prewarm_caches:
+        _prewarm()
@@ -56,6 +56,7 @@ export interface TimelineEvent {
 }
 
 export interface TripResult {
+  trip_id?: number;
   locations: Locations;
   route: Route;
   fuel_stops: FuelStop[];